@@ -8,18 +8,195 @@ El MDVRP es una extensión del VRP donde hay múltiples depósitos (almacenes) d
 y los vehículos deben ser asignados a depósitos y las rutas deben ser construidas para atender a los clientes.
 """
 
-import math
 import json
 import random
 from typing import List, Dict, Tuple, Any
 
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # Sin numba, los kernels se ejecutan como Python puro
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    
+    prange = range
+
+try:
+    import orjson
+except ImportError:  # Sin orjson, la E/S del script usa el módulo json estándar
+    orjson = None
+
+try:
+    import simsimd
+except ImportError:  # Sin simsimd, la matriz de distancias se calcula con NumPy
+    simsimd = None
+
 # Alias de tipos
-Location = Tuple[float, float]           # Tupla de (latitud, longitud)
 Warehouse = Dict[str, Any]               # Diccionario con datos del almacén
 Store = Dict[str, Any]                   # Diccionario con datos de la tienda
 Truck = Dict[str, Any]                   # Diccionario con datos del camión
 Route = Dict[str, Any]                   # Diccionario con datos de la ruta
 
+EARTH_RADIUS_KM = 6371  # Radio de la tierra en kilómetros
+LOCAL_SEARCH_EPS = 1e-3 # Mejora mínima (km) para aceptar un movimiento de búsqueda local
+OR_OPT_MAX_SEGMENT = 3  # Longitud máxima de segmento reubicado por Or-opt
+
+
+@njit(cache=True)
+def _reverse_segment_nb(route: np.ndarray, lo: int, hi: int) -> None:
+    """Invierte route[lo..hi] en el lugar, sin copias intermedias"""
+    while lo < hi:
+        route[lo], route[hi] = route[hi], route[lo]
+        lo += 1
+        hi -= 1
+
+
+@njit(cache=True)
+def _two_opt_nb(D: np.ndarray, wh_idx: int, route: np.ndarray) -> float:
+    """
+    Kernel 2-opt compilado sobre índices de la matriz de distancias
+    
+    Cada intercambio se evalúa en O(1) comparando solo las dos aristas que
+    cambian al invertir el segmento route[i..j]. Se aplica la primera mejora
+    encontrada y se reinicia la pasada.
+    
+    Args:
+        D: Matriz (N x N) de distancias
+        wh_idx: Índice del almacén en D
+        route: Arreglo int32 de índices de tiendas; se modifica en el lugar
+        
+    Returns:
+        Variación total de la distancia de la ruta (negativa si mejora)
+    """
+    n = route.shape[0]
+    gain = 0.0
+    extended = np.empty(n + 2, dtype=route.dtype)
+    improved = True
+    
+    while improved:
+        improved = False
+        
+        # Ruta cerrada: almacén + tiendas + almacén
+        extended[0] = wh_idx
+        extended[1:n+1] = route
+        extended[n+1] = wh_idx
+        
+        for i in range(n - 1):
+            for j in range(i + 1, n):
+                # Aristas (i, i+1) y (j+1, j+2) pasan a ser (i, j+1) y (i+1, j+2).
+                # Se suma en float64: con aristas largas el redondeo en float32
+                # supera LOCAL_SEARCH_EPS y un movimiento nulo y su inverso
+                # parecerían mejoras, ciclando indefinidamente
+                delta = (np.float64(D[extended[i], extended[j+1]])
+                         + np.float64(D[extended[i+1], extended[j+2]])
+                         - np.float64(D[extended[i], extended[i+1]])
+                         - np.float64(D[extended[j+1], extended[j+2]]))
+                
+                if delta < -LOCAL_SEARCH_EPS:
+                    _reverse_segment_nb(route, i, j)
+                    gain += delta
+                    improved = True
+                    break
+            
+            if improved:
+                break
+    
+    return gain
+
+
+@njit(cache=True)
+def _or_opt_nb(D: np.ndarray, wh_idx: int, route: np.ndarray) -> float:
+    """
+    Kernel Or-opt: reubica segmentos de 1 a OR_OPT_MAX_SEGMENT tiendas
+    
+    Complementa a 2-opt con movimientos que este no puede alcanzar. Cada
+    reubicación se evalúa en O(1) y se aplica la primera mejora encontrada.
+    
+    Args:
+        D: Matriz (N x N) de distancias
+        wh_idx: Índice del almacén en D
+        route: Arreglo int32 de índices de tiendas; se modifica en el lugar
+        
+    Returns:
+        Variación total de la distancia de la ruta (negativa si mejora)
+    """
+    n = route.shape[0]
+    gain = 0.0
+    extended = np.empty(n + 2, dtype=route.dtype)
+    improved = True
+    
+    while improved:
+        improved = False
+        
+        # Ruta cerrada: almacén + tiendas + almacén
+        extended[0] = wh_idx
+        extended[1:n+1] = route
+        extended[n+1] = wh_idx
+        
+        for seg_len in range(1, min(OR_OPT_MAX_SEGMENT, n - 1) + 1):
+            for i in range(n - seg_len + 1):
+                # El segmento route[i..i+seg_len-1] ocupa extended[i+1..i+seg_len]
+                prev = extended[i]
+                first = extended[i+1]
+                last = extended[i+seg_len]
+                nxt = extended[i+seg_len+1]
+                # Todas las variaciones se suman en float64, como en 2-opt
+                removed = (np.float64(D[prev, first]) + np.float64(D[last, nxt])
+                           - np.float64(D[prev, nxt]))
+                
+                # Inserta el segmento en la arista (extended[p], extended[p+1])
+                for p in range(n + 1):
+                    if i <= p <= i + seg_len:
+                        continue
+                    
+                    delta = (np.float64(D[extended[p], first])
+                             + np.float64(D[last, extended[p+1]])
+                             - np.float64(D[extended[p], extended[p+1]])
+                             - removed)
+                    
+                    if delta < -LOCAL_SEARCH_EPS:
+                        # Mueve el segmento rotando el tramo intermedio
+                        if p < i:
+                            _reverse_segment_nb(route, p, i + seg_len - 1)
+                            _reverse_segment_nb(route, p, p + seg_len - 1)
+                            _reverse_segment_nb(route, p + seg_len, i + seg_len - 1)
+                        else:
+                            _reverse_segment_nb(route, i, i + seg_len - 1)
+                            _reverse_segment_nb(route, i + seg_len, p - 1)
+                            _reverse_segment_nb(route, i, p - 1)
+                        gain += delta
+                        improved = True
+                        break
+                
+                if improved:
+                    break
+            
+            if improved:
+                break
+    
+    return gain
+
+
+@njit(cache=True, parallel=True)
+def _improve_routes_nb(D: np.ndarray, wh_idx: np.ndarray, routes_idx: np.ndarray,
+                       lengths: np.ndarray, deltas: np.ndarray) -> None:
+    """
+    Aplica 2-opt seguido de Or-opt a varias rutas en paralelo
+    
+    Args:
+        D: Matriz (N x N) de distancias
+        wh_idx: Índice del almacén de cada ruta
+        routes_idx: Matriz int32 (rutas x longitud máxima) con las rutas rellenadas
+        lengths: Número de tiendas de cada ruta
+        deltas: Salida con la variación de distancia de cada ruta
+    """
+    for r in prange(routes_idx.shape[0]):
+        route = routes_idx[r, :lengths[r]]
+        deltas[r] = _two_opt_nb(D, wh_idx[r], route) + _or_opt_nb(D, wh_idx[r], route)
+
 class MDVRPSolver:
     """
     Solucionador del Problema de Ruteo de Vehículos con Múltiples Depósitos
@@ -43,61 +220,47 @@ class MDVRPSolver:
         self.trucks = trucks
         self.routes = []
         
+        # Índices por ID para evitar búsquedas lineales
+        self._truck_by_id = {t['id']: t for t in self.trucks}
+        self._warehouse_by_id = {w['id']: w for w in self.warehouses}
+        
         # Precalcula distancias
-        self.distances = {}
+        self._id_to_idx: Dict[str, int] = {}
+        self._idx_to_id: List[str] = []
+        self.D = np.zeros((0, 0), dtype=np.float32)
         self._precompute_distances()
     
     def _precompute_distances(self):
-        """Calcula y almacena todas las distancias entre pares de ubicaciones"""
-        # Almacena distancias entre almacenes
-        for w1 in self.warehouses:
-            for w2 in self.warehouses:
-                self.distances[(w1['id'], w2['id'])] = self._calculate_distance(
-                    (w1['location']['lat'], w1['location']['lng']), 
-                    (w2['location']['lat'], w2['location']['lng'])
-                )
-        
-        # Almacena distancias entre almacenes y tiendas
-        for w in self.warehouses:
-            for s in self.stores:
-                self.distances[(w['id'], s['id'])] = self._calculate_distance(
-                    (w['location']['lat'], w['location']['lng']),
-                    (s['location']['lat'], s['location']['lng'])
-                )
-                self.distances[(s['id'], w['id'])] = self.distances[(w['id'], s['id'])]
-        
-        # Almacena distancias entre tiendas
-        for s1 in self.stores:
-            for s2 in self.stores:
-                self.distances[(s1['id'], s2['id'])] = self._calculate_distance(
-                    (s1['location']['lat'], s1['location']['lng']),
-                    (s2['location']['lat'], s2['location']['lng'])
-                )
-    
-    def _calculate_distance(self, loc1: Location, loc2: Location) -> float:
         """
-        Calcula la distancia de Haversine entre dos ubicaciones
+        Calcula la matriz de distancias de Haversine entre todas las ubicaciones
         
-        Args:
-            loc1: Tupla de (latitud, longitud) para la primera ubicación
-            loc2: Tupla de (latitud, longitud) para la segunda ubicación
-            
-        Returns:
-            Distancia en kilómetros
+        Los almacenes y las tiendas se indexan en una sola matriz (N x N), de modo
+        que la distancia entre dos IDs es self.D[self._id_to_idx[a], self._id_to_idx[b]]
         """
-        lat1, lon1 = loc1
-        lat2, lon2 = loc2
-        
-        # Convierte a radianes
-        lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-        
-        # Fórmula de Haversine
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        r = 6371  # Radio de la tierra en kilómetros
-        return c * r
+        locations = self.warehouses + self.stores
+        self._idx_to_id = [loc['id'] for loc in locations]
+        self._id_to_idx = {loc_id: i for i, loc_id in enumerate(self._idx_to_id)}
+        
+        # Convierte a radianes una sola vez
+        lat = np.radians(np.array([loc['location']['lat'] for loc in locations], dtype=np.float64))
+        lon = np.radians(np.array([loc['location']['lng'] for loc in locations], dtype=np.float64))
+        cos_lat = np.cos(lat)
+        
+        if simsimd is not None and len(locations) > 0:
+            # El término de Haversine es (cuerda / 2)^2, así que basta con el
+            # kernel SIMD de distancia euclidiana al cuadrado entre puntos
+            # cartesianos sobre la esfera unitaria
+            xyz = np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+            a = np.asarray(simsimd.cdist(xyz, xyz, metric='sqeuclidean')) / 4
+        else:
+            # Fórmula de Haversine vectorizada sobre todos los pares
+            dlat = lat[:, None] - lat[None, :]
+            dlon = lon[:, None] - lon[None, :]
+            a = np.sin(dlat/2)**2 + cos_lat[:, None] * cos_lat[None, :] * np.sin(dlon/2)**2
+        D = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        
+        # float32 basta para distancias de ruteo y reduce a la mitad la memoria
+        self.D = D.astype(np.float32)
     
     def assign_stores_to_warehouses(self):
         """
@@ -108,19 +271,17 @@ class MDVRPSolver:
         """
         assignments = {w['id']: [] for w in self.warehouses}
         
+        if not self.warehouses or not self.stores:
+            return assignments
+        
+        wh_idx = np.array([self._id_to_idx[w['id']] for w in self.warehouses])
+        st_idx = np.array([self._id_to_idx[s['id']] for s in self.stores])
+        
         # Para cada tienda, encuentra el almacén más cercano
-        for store in self.stores:
-            closest_warehouse = None
-            min_distance = float('inf')
-            
-            for warehouse in self.warehouses:
-                dist = self.distances[(warehouse['id'], store['id'])]
-                if dist < min_distance:
-                    min_distance = dist
-                    closest_warehouse = warehouse['id']
-            
-            if closest_warehouse:
-                assignments[closest_warehouse].append(store['id'])
+        nearest = self.D[np.ix_(st_idx, wh_idx)].argmin(axis=1)
+        
+        for store, w in zip(self.stores, nearest):
+            assignments[self.warehouses[w]['id']].append(store['id'])
         
         return assignments
     
@@ -154,13 +315,14 @@ class MDVRPSolver:
                 continue
             
             # Obtiene objetos tienda
-            stores_to_assign = [s for s in self.stores if s['id'] in store_ids]
+            assigned_ids = set(store_ids)
+            stores_to_assign = [s for s in self.stores if s['id'] in assigned_ids]
             
             # Ordena tiendas por demanda (descendente)
             stores_to_assign.sort(key=lambda s: s['demand'], reverse=True)
             
             # Encuentra el objeto almacén
-            warehouse = next(w for w in self.warehouses if w['id'] == warehouse_id)
+            warehouse = self._warehouse_by_id[warehouse_id]
             
             # Crea rutas usando un enfoque simple de empaquetado
             for truck in trucks:
@@ -168,14 +330,19 @@ class MDVRPSolver:
                 current_route = []
                 current_capacity = 0
                 
+                assigned = [False] * len(stores_to_assign)
+                
                 # Enfoque voraz - añade tiendas hasta llenar el camión
-                for store in stores_to_assign[:]:
+                for k, store in enumerate(stores_to_assign):
                     if current_capacity + store['demand'] <= truck_capacity:
                         current_route.append(store['id'])
                         current_capacity += store['demand']
-                        stores_to_assign.remove(store)
+                        assigned[k] = True
                 
                 if current_route:
+                    # Descarta de una vez las tiendas asignadas a este camión
+                    stores_to_assign = [s for s, a in zip(stores_to_assign, assigned) if not a]
+                    
                     # Optimiza la ruta usando vecino más cercano
                     optimized_route = self._optimize_route(warehouse_id, current_route)
                     
@@ -240,16 +407,21 @@ class MDVRPSolver:
         if not store_ids:
             return []
         
-        unvisited = store_ids.copy()
-        current_location = warehouse_id
+        store_idx = np.array([self._id_to_idx[store_id] for store_id in store_ids], dtype=np.int32)
+        n = len(store_idx)
+        visited = np.zeros(n, dtype=np.bool_)
+        current_idx = self._id_to_idx[warehouse_id]
         tour = []
         
-        while unvisited:
+        for _ in range(n):
             # Encuentra la tienda no visitada más cercana
-            nearest = min(unvisited, key=lambda store_id: self.distances[(current_location, store_id)])
-            tour.append(nearest)
-            current_location = nearest
-            unvisited.remove(nearest)
+            candidates = self.D[current_idx, store_idx]
+            candidates[visited] = np.inf
+            nearest = int(np.argmin(candidates))
+            
+            visited[nearest] = True
+            current_idx = store_idx[nearest]
+            tour.append(store_ids[nearest])
         
         return tour
     
@@ -270,17 +442,7 @@ class MDVRPSolver:
         if not store_ids:
             return 0.0, 0.0
         
-        total_distance = 0.0
-        
-        # Distancia desde el almacén a la primera tienda
-        total_distance += self.distances[(warehouse_id, store_ids[0])]
-        
-        # Distancia entre tiendas
-        for i in range(len(store_ids) - 1):
-            total_distance += self.distances[(store_ids[i], store_ids[i+1])]
-        
-        # Distancia desde la última tienda de vuelta al almacén
-        total_distance += self.distances[(store_ids[-1], warehouse_id)]
+        total_distance = self._calculate_route_distance(warehouse_id, store_ids)
         
         # Calcula tiempo (distancia / velocidad)
         total_time = total_distance / speed
@@ -300,60 +462,55 @@ class MDVRPSolver:
         if not self.routes:
             self.create_initial_routes()
         
-        for _ in range(iterations):
-            # Aplica búsqueda local 2-opt a cada ruta
-            for i, route in enumerate(self.routes):
-                store_ids = route['stores']
-                if len(store_ids) >= 4:  # Solo aplica 2-opt si hay suficientes tiendas
-                    improved_route = self._two_opt(route['warehouseId'], store_ids)
-                    
-                    if improved_route != store_ids:
-                        # Actualiza ruta con secuencia mejorada
-                        self.routes[i]['stores'] = improved_route
-                        
-                        # Recalcula métricas
-                        truck = next(t for t in self.trucks if t['id'] == route['truckId'])
-                        distance, time = self._calculate_route_metrics(
-                            route['warehouseId'], route['truckId'], improved_route, truck['speed']
-                        )
-                        
-                        self.routes[i]['distance'] = distance
-                        self.routes[i]['estimatedTime'] = time
-        
-        return self.routes
-    
-    def _two_opt(self, warehouse_id: str, route: List[str]) -> List[str]:
-        """
-        Aplica búsqueda local 2-opt para mejorar una ruta
+        # Solo aplica 2-opt si hay suficientes tiendas
+        candidates = [i for i, route in enumerate(self.routes) if len(route['stores']) >= 4]
+        if not candidates:
+            return self.routes
+        
+        # Empaqueta las rutas en una matriz de índices rellenada
+        max_len = max(len(self.routes[i]['stores']) for i in candidates)
+        routes_idx = np.zeros((len(candidates), max_len), dtype=np.int32)
+        lengths = np.empty(len(candidates), dtype=np.int32)
+        wh_idx = np.empty(len(candidates), dtype=np.int32)
+        distances = np.empty(len(candidates), dtype=np.float64)
+        speeds = np.empty(len(candidates), dtype=np.float64)
+        deltas = np.zeros(len(candidates), dtype=np.float64)
+        
+        for r, i in enumerate(candidates):
+            route = self.routes[i]
+            path = self._route_path(route['warehouseId'], route['stores'])
+            lengths[r] = len(path) - 2
+            wh_idx[r] = path[0]
+            routes_idx[r, :lengths[r]] = path[1:-1]
+            distances[r] = route['distance']
+            speeds[r] = self._truck_by_id[route['truckId']]['speed']
         
-        Args:
-            warehouse_id: ID del almacén
-            route: Lista de IDs de tiendas representando la ruta
+        for _ in range(iterations):
+            # Aplica búsqueda local 2-opt y Or-opt a cada ruta
+            _improve_routes_nb(self.D, wh_idx, routes_idx, lengths, deltas)
             
-        Returns:
-            Ruta mejorada
-        """
-        best_route = route.copy()
-        improved = True
-        
-        while improved:
-            improved = False
-            best_distance = self._calculate_route_distance(warehouse_id, best_route)
+            # Actualiza distancias con la variación de los movimientos aceptados
+            distances += deltas
             
-            for i in range(len(route) - 1):
-                for j in range(i + 1, len(route)):
-                    new_route = best_route.copy()
-                    # Invierte el segmento entre i y j
-                    new_route[i:j+1] = reversed(new_route[i:j+1])
-                    
-                    new_distance = self._calculate_route_distance(warehouse_id, new_route)
-                    
-                    if new_distance < best_distance:
-                        best_distance = new_distance
-                        best_route = new_route
-                        improved = True
+            # Si ninguna ruta cambió, las iteraciones restantes no harían nada
+            if not deltas.any():
+                break
+        
+        # Desempaqueta las rutas mejoradas
+        for r, i in enumerate(candidates):
+            route = self.routes[i]
+            store_ids = route['stores']
+            improved_route = [self._idx_to_id[idx] for idx in routes_idx[r, :lengths[r]]]
             
-        return best_route
+            if improved_route != store_ids:
+                # Actualiza ruta con secuencia mejorada
+                self.routes[i]['stores'] = improved_route
+                
+                # El tiempo se deriva de la distancia acumulada una sola vez
+                self.routes[i]['distance'] = float(distances[r])
+                self.routes[i]['estimatedTime'] = float(distances[r] / speeds[r])
+        
+        return self.routes
     
     def _calculate_route_distance(self, warehouse_id: str, store_ids: List[str]) -> float:
         """
@@ -369,19 +526,26 @@ class MDVRPSolver:
         if not store_ids:
             return 0.0
         
-        total_distance = 0.0
-        
-        # Distancia desde el almacén a la primera tienda
-        total_distance += self.distances[(warehouse_id, store_ids[0])]
-        
-        # Distancia entre tiendas
-        for i in range(len(store_ids) - 1):
-            total_distance += self.distances[(store_ids[i], store_ids[i+1])]
+        path = self._route_path(warehouse_id, store_ids)
         
-        # Distancia desde la última tienda de vuelta al almacén
-        total_distance += self.distances[(store_ids[-1], warehouse_id)]
+        # Suma todas las aristas de la ruta cerrada con un solo acceso vectorizado
+        return float(self.D[path[:-1], path[1:]].sum(dtype=np.float64))
+    
+    def _route_path(self, warehouse_id: str, store_ids: List[str]) -> np.ndarray:
+        """
+        Traduce una ruta a índices de la matriz de distancias
         
-        return total_distance
+        Args:
+            warehouse_id: ID del almacén
+            store_ids: Lista de IDs de tiendas en la ruta
+            
+        Returns:
+            Arreglo int32 con el almacén al inicio y al final de la ruta
+        """
+        path = np.empty(len(store_ids) + 2, dtype=np.int32)
+        path[0] = path[-1] = self._id_to_idx[warehouse_id]
+        path[1:-1] = [self._id_to_idx[store_id] for store_id in store_ids]
+        return path
 
 def solve_mdvrp(warehouses, stores, trucks, iterations=100):
     """
@@ -418,8 +582,12 @@ if __name__ == "__main__":
     output_file = sys.argv[2]
     
     try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
+        if orjson is not None:
+            with open(input_file, 'rb') as f:
+                data = orjson.loads(f.read())
+        else:
+            with open(input_file, 'r') as f:
+                data = json.load(f)
         
         warehouses = data.get('warehouses', [])
         stores = data.get('stores', [])
@@ -427,8 +595,12 @@ if __name__ == "__main__":
         
         routes = solve_mdvrp(warehouses, stores, trucks)
         
-        with open(output_file, 'w') as f:
-            json.dump({'routes': routes}, f, indent=2)
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps({'routes': routes}, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_file, 'w') as f:
+                json.dump({'routes': routes}, f, indent=2)
             
         print(f"MDVRP resuelto exitosamente y resultados escritos en {output_file}")
         
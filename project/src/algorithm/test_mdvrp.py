@@ -0,0 +1,122 @@
+"""
+Pruebas de los kernels de búsqueda local del solucionador MDVRP
+"""
+
+import random
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pytest
+
+from mdvrp import MDVRPSolver, _or_opt_nb, _two_opt_nb
+
+# Tolerancia (km) entre la variación acumulada y la recalculada con la matriz float32
+GAIN_TOLERANCE_KM = 1e-3
+
+
+def _random_solver(n_stores: int, seed: int) -> MDVRPSolver:
+    """Crea un solucionador con un almacén y tiendas en ubicaciones aleatorias"""
+    rng = random.Random(seed)
+    warehouses = [{'id': 'w0', 'location': {'lat': 40 + rng.random(), 'lng': -4 + rng.random()}}]
+    stores = [
+        {'id': f's{i}', 'location': {'lat': 40 + rng.random(), 'lng': -4 + rng.random()}, 'demand': 1}
+        for i in range(n_stores)
+    ]
+    return MDVRPSolver(warehouses, stores, [])
+
+
+def _long_edge_instance() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Almacén en (0, 0) con tiendas cerca del antimeridiano
+    
+    Las aristas de casi 20.000 km hacen que el redondeo en float32 de la
+    variación supere LOCAL_SEARCH_EPS.
+    """
+    rng = random.Random(4)
+    warehouses = [{'id': 'w0', 'location': {'lat': 0.0, 'lng': 0.0}}]
+    stores = []
+    for i in range(6):
+        lat = rng.uniform(-20, 20)
+        lng = rng.uniform(150, 180) * rng.choice([-1, 1])
+        stores.append({'id': f's{i}', 'location': {'lat': lat, 'lng': lng}, 'demand': 1})
+    trucks = [{'id': 't0', 'warehouseId': 'w0', 'capacity': 100, 'speed': 50}]
+    return warehouses, stores, trucks
+
+
+def _tour_length(D: np.ndarray, wh_idx: int, route: np.ndarray) -> float:
+    """Longitud de la ruta cerrada almacén -> tiendas -> almacén"""
+    path = np.concatenate(([wh_idx], route, [wh_idx]))
+    return float(D[path[:-1], path[1:]].sum(dtype=np.float64))
+
+
+@pytest.mark.parametrize('kernel', [_two_opt_nb, _or_opt_nb])
+@pytest.mark.parametrize('n_stores', [4, 5, 12, 40])
+@pytest.mark.parametrize('seed', range(5))
+def test_local_search_kernel_keeps_permutation_and_reports_gain(kernel, n_stores, seed):
+    solver = _random_solver(n_stores, seed)
+    wh_idx = solver._id_to_idx['w0']
+    
+    # Orden aleatorio de las tiendas para que haya mejoras que aplicar
+    route = np.array([solver._id_to_idx[f's{i}'] for i in range(n_stores)], dtype=np.int32)
+    np.random.default_rng(seed).shuffle(route)
+    original = route.copy()
+    before = _tour_length(solver.D, wh_idx, route)
+    
+    gain = kernel(solver.D, wh_idx, route)
+    
+    assert sorted(route.tolist()) == sorted(original.tolist())
+    assert gain <= 0.0
+    assert gain == pytest.approx(_tour_length(solver.D, wh_idx, route) - before, abs=GAIN_TOLERANCE_KM)
+
+
+@pytest.mark.parametrize('kernel', [_two_opt_nb, _or_opt_nb])
+def test_local_search_kernel_terminates_on_long_edges(kernel):
+    solver = MDVRPSolver(*_long_edge_instance())
+    route = solver.create_initial_routes()[0]
+    path = solver._route_path(route['warehouseId'], route['stores'])
+    store_idx = path[1:-1].copy()
+    before = _tour_length(solver.D, path[0], store_idx)
+    
+    # Con la variación en float32 este llamado no terminaba
+    gain = kernel(solver.D, path[0], store_idx)
+    
+    assert sorted(store_idx.tolist()) == sorted(path[1:-1].tolist())
+    assert gain == pytest.approx(_tour_length(solver.D, path[0], store_idx) - before, abs=GAIN_TOLERANCE_KM)
+
+
+@pytest.mark.parametrize('instance', ['local', 'long_edge'])
+def test_improve_routes_keeps_metrics_consistent(instance):
+    if instance == 'long_edge':
+        warehouses, stores, trucks = _long_edge_instance()
+    else:
+        rng = random.Random(7)
+        warehouses = [
+            {'id': f'w{i}', 'location': {'lat': 40 + rng.random(), 'lng': -4 + rng.random()}}
+            for i in range(2)
+        ]
+        stores = [
+            {'id': f's{i}', 'location': {'lat': 40 + rng.random(), 'lng': -4 + rng.random()},
+             'demand': rng.randint(1, 10)}
+            for i in range(80)
+        ]
+        trucks = [
+            {'id': f't{i}', 'warehouseId': f'w{i % 2}', 'capacity': 60, 'speed': 40 + 10 * i}
+            for i in range(4)
+        ]
+    
+    solver = MDVRPSolver(warehouses, stores, trucks)
+    solver.create_initial_routes()
+    routes = solver.improve_routes()
+    
+    assert sorted(s for route in routes for s in route['stores']) == sorted(s['id'] for s in stores)
+    
+    speeds = {t['id']: t['speed'] for t in trucks}
+    for route in routes:
+        expected = solver._calculate_route_distance(route['warehouseId'], route['stores'])
+        assert route['distance'] == pytest.approx(expected, abs=GAIN_TOLERANCE_KM)
+        assert route['estimatedTime'] == pytest.approx(route['distance'] / speeds[route['truckId']])
+    
+    # Una vez convergidas, otra pasada no debe cambiar ninguna ruta
+    before = [(route['stores'][:], route['distance']) for route in routes]
+    solver.improve_routes()
+    assert [(route['stores'], route['distance']) for route in solver.routes] == before